@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Business logic shared by the local Flask app (app.py) and the Vercel
+serverless entrypoint (api/index.py), so caches and query optimizations
+apply to both instead of needing to be mirrored by hand.
+"""
+
+import sqlite3
+from datetime import date
+from functools import lru_cache
+from typing import Tuple
+
+# ---------- Database Setup ----------
+def connect(db_path: str) -> sqlite3.Connection:
+    """Open a connection with the row factory and pragmas applied once"""
+    # cached_statements sizes the connection-level prepared-statement cache;
+    # repeated queries through conn.execute() skip re-parsing their SQL
+    conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    return conn
+
+def init_schema(conn: sqlite3.Connection):
+    """Create tables, indexes and run migrations on an open connection"""
+    cur = conn.cursor()
+
+    # Vendors table
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS vendors (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        phone TEXT,
+        email TEXT,
+        address TEXT,
+        default_credit_days INTEGER DEFAULT 30,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+    # Purchases table
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS purchases (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        vendor_id INTEGER NOT NULL,
+        bill_no TEXT NOT NULL,
+        bill_date TEXT NOT NULL,
+        credit_days INTEGER NOT NULL,
+        bill_amount REAL NOT NULL,
+        advance_paid REAL DEFAULT 0,
+        due_date TEXT NOT NULL,
+        status TEXT NOT NULL,
+        payment_type TEXT DEFAULT 'Credit',
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        pending_amount REAL GENERATED ALWAYS AS (bill_amount - COALESCE(advance_paid, 0)) VIRTUAL,
+        FOREIGN KEY(vendor_id) REFERENCES vendors(id)
+    )
+    """)
+
+    # Payments table
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS payments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        purchase_id INTEGER NOT NULL,
+        paid_amount REAL NOT NULL,
+        paid_date TEXT NOT NULL,
+        payment_method TEXT DEFAULT 'Cash',
+        note TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(purchase_id) REFERENCES purchases(id)
+    )
+    """)
+
+    # Check Issuance table
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS check_issuance (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        vendor_id INTEGER NOT NULL,
+        check_number TEXT NOT NULL,
+        check_date TEXT NOT NULL,
+        remarks TEXT,
+        status TEXT NOT NULL DEFAULT 'Pending',
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(vendor_id) REFERENCES vendors(id)
+    )
+    """)
+
+    # Indexes for the hot query paths: dashboard ordering/filtering by due
+    # date, purchase listing by created_at, payment lookups by purchase, and
+    # vendor joins. The partial index lets the dashboard skip paid rows.
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_purchases_due_date ON purchases(due_date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_purchases_vendor_id ON purchases(vendor_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_purchases_created_at ON purchases(created_at DESC)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_purchases_due_date_unpaid ON purchases(due_date) WHERE status != 'Paid'")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_payments_purchase_id ON payments(purchase_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_check_issuance_vendor_id ON check_issuance(vendor_id)")
+
+    # Migration: add the generated pending_amount column to existing
+    # databases (table_xinfo is needed to see virtual columns)
+    columns = [row[1] for row in cur.execute("PRAGMA table_xinfo(purchases)")]
+    if 'pending_amount' not in columns:
+        cur.execute("""
+        ALTER TABLE purchases ADD COLUMN pending_amount REAL
+        GENERATED ALWAYS AS (bill_amount - COALESCE(advance_paid, 0)) VIRTUAL
+        """)
+    # Partial index so due-date scans skip settled purchases at the B-tree level
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_purchases_pending_due ON purchases(due_date) WHERE pending_amount > 0")
+
+    # Migration: drop the denormalized vendor_name column from existing
+    # databases - the name is always joined from vendors at read time
+    columns = [row[1] for row in cur.execute("PRAGMA table_info(check_issuance)")]
+    if 'vendor_name' in columns:
+        cur.execute("ALTER TABLE check_issuance DROP COLUMN vendor_name")
+
+    conn.commit()
+
+# ---------- Business Logic ----------
+@lru_cache(maxsize=4096)
+def parse_date(s: str) -> date:
+    # date.fromisoformat is C-accelerated; the cache turns repeated parses
+    # of the same bill/due date strings into dict lookups (dates are
+    # immutable, so sharing the instances is safe)
+    return date.fromisoformat(s)
+
+def calculate_status(due_date_str: str, bill_amount: float, advance_paid: float) -> Tuple[str, int]:
+    """Calculate status and days remaining for a purchase"""
+    due_date = parse_date(due_date_str)
+    pending_amount = bill_amount - (advance_paid or 0)
+    today = date.today()
+    days_remaining = (due_date - today).days
+
+    if pending_amount <= 0:
+        status = "Paid"
+    elif days_remaining < 0:
+        status = "Overdue"
+    elif days_remaining == 0:
+        status = "Due Today"
+    else:
+        status = "Pending"
+
+    return status, days_remaining
+
+# Status -> Bootstrap color class; anything not listed falls through to the
+# days_remaining range check
+_STATUS_COLOR = {
+    "Paid": "success",
+    "Overdue": "danger",
+    "Due Today": "warning",
+}
+
+def get_status_color(status: str, days_remaining: int) -> str:
+    """Get Bootstrap color class for status"""
+    return _STATUS_COLOR.get(status) or ("warning" if days_remaining <= 7 else "info")
+
+# ---------- Dashboard Queries ----------
+
+# Shared SQL fragments for the dashboard: pending amount comes from the
+# generated column and days remaining is computed inside SQLite, so the
+# bucketing never touches Python.
+PENDING_SQL = "p.pending_amount"
+DAYS_REMAINING_SQL = "CAST(julianday(p.due_date) - julianday('now', 'localtime', 'start of day') AS INTEGER)"
+
+# Rows listed per dashboard category per page
+DASHBOARD_PAGE_SIZE = 50
+
+def recompute_status_sql(delta_expr: str = "?") -> str:
+    """Status CASE for when advance_paid changes by delta_expr, so payment
+    mutations are a single atomic UPDATE instead of SELECT-then-UPDATE.
+    SET expressions see the old row, so the delta appears again in the CASE.
+    delta_expr may be a plain placeholder or a correlated subquery."""
+    return f"""
+        CASE
+            WHEN bill_amount - (COALESCE(advance_paid, 0) + ({delta_expr})) <= 0 THEN 'Paid'
+            WHEN julianday(due_date) < julianday('now', 'localtime', 'start of day') THEN 'Overdue'
+            WHEN julianday(due_date) = julianday('now', 'localtime', 'start of day') THEN 'Due Today'
+            ELSE 'Pending'
+        END
+"""
+
+def apply_payment_delta(conn, purchase_id: int, delta: float):
+    """Apply a payment delta to a purchase and recompute its status in SQL"""
+    conn.execute(f"""
+    UPDATE purchases
+    SET advance_paid = COALESCE(advance_paid, 0) + ?,
+        status = {recompute_status_sql()}
+    WHERE id = ?
+    """, (delta, delta, purchase_id))
+
+def dashboard_context(conn, reminder_days: int = 7, payment_type_filter: str = 'all', page: int = 1) -> dict:
+    """Build the dashboard.html template context from the three SQL queries"""
+    offset = (page - 1) * DASHBOARD_PAGE_SIZE
+
+    # Optional payment type filter applied to every dashboard query
+    filter_sql = ""
+    filter_params = []
+    if payment_type_filter != 'all':
+        filter_sql = " AND p.payment_type = ?"
+        filter_params.append(payment_type_filter)
+
+    # One aggregate query computes all four bucket counts and totals
+    # server-side with conditional aggregation, so only a single summary row
+    # crosses the driver no matter how many purchases exist
+    totals = conn.execute(f"""
+    SELECT
+        COUNT(CASE WHEN pending_amount > 0 AND days_remaining < 0 THEN 1 END) AS overdue_count,
+        COUNT(CASE WHEN pending_amount > 0 AND days_remaining = 0 THEN 1 END) AS due_today_count,
+        COUNT(CASE WHEN pending_amount > 0 AND days_remaining BETWEEN 1 AND ? THEN 1 END) AS due_soon_count,
+        COUNT(CASE WHEN pending_amount <= 0 THEN 1 END) AS paid_count,
+        COALESCE(SUM(CASE WHEN pending_amount > 0 AND days_remaining < 0 THEN pending_amount END), 0) AS overdue_total,
+        COALESCE(SUM(CASE WHEN pending_amount > 0 AND days_remaining = 0 THEN pending_amount END), 0) AS due_today_total,
+        COALESCE(SUM(CASE WHEN pending_amount > 0 AND days_remaining BETWEEN 1 AND ? THEN pending_amount END), 0) AS due_soon_total,
+        COALESCE(SUM(CASE WHEN pending_amount <= 0 THEN bill_amount END), 0) AS paid_total
+    FROM (
+        SELECT p.bill_amount,
+               {PENDING_SQL} AS pending_amount,
+               {DAYS_REMAINING_SQL} AS days_remaining
+        FROM purchases p
+        WHERE 1=1{filter_sql}
+    )
+    """, [reminder_days, reminder_days] + filter_params).fetchone()
+
+    # Vendor-wise summary aggregated in SQL (one row per vendor with pending bills)
+    vendor_rows = conn.execute(f"""
+    SELECT v.name AS vendor_name, v.phone AS vendor_phone,
+           COUNT(*) AS count, SUM({PENDING_SQL}) AS total
+    FROM purchases p
+    JOIN vendors v ON v.id = p.vendor_id
+    WHERE {PENDING_SQL} > 0{filter_sql}
+    GROUP BY v.id
+    ORDER BY v.name
+    """, filter_params)
+    vendor_summary = {row['vendor_name']: {'count': row['count'], 'total': row['total'], 'phone': row['vendor_phone']}
+                      for row in vendor_rows}
+
+    # Fetch each category bounded by LIMIT/OFFSET instead of materializing
+    # every purchase; one extra row is requested to detect further pages
+    category_filters = {
+        'overdue': (f"{PENDING_SQL} > 0 AND {DAYS_REMAINING_SQL} < 0", []),
+        'due_today': (f"{PENDING_SQL} > 0 AND {DAYS_REMAINING_SQL} = 0", []),
+        'due_soon': (f"{PENDING_SQL} > 0 AND {DAYS_REMAINING_SQL} BETWEEN 1 AND ?", [reminder_days]),
+        'paid': (f"{PENDING_SQL} <= 0", []),
+    }
+    buckets = {}
+    has_more = {}
+    for category, (where_sql, where_params) in category_filters.items():
+        rows = conn.execute(f"""
+        SELECT p.id, p.bill_no, p.bill_date, p.due_date, p.bill_amount,
+               p.advance_paid, p.payment_type,
+               v.name AS vendor_name, v.phone AS vendor_phone,
+               {PENDING_SQL} AS pending_amount,
+               {DAYS_REMAINING_SQL} AS days_remaining
+        FROM purchases p
+        JOIN vendors v ON v.id = p.vendor_id
+        WHERE {where_sql}{filter_sql}
+        ORDER BY p.due_date
+        LIMIT ? OFFSET ?
+        """, where_params + filter_params + [DASHBOARD_PAGE_SIZE + 1, offset]).fetchall()
+        has_more[category] = len(rows) > DASHBOARD_PAGE_SIZE
+        buckets[category] = rows[:DASHBOARD_PAGE_SIZE]
+
+    return {
+        'overdue': buckets['overdue'],
+        'due_today': buckets['due_today'],
+        'due_soon': buckets['due_soon'],
+        'paid': buckets['paid'],
+        'reminder_days': reminder_days,
+        'payment_type_filter': payment_type_filter,
+        'page': page,
+        'has_more': has_more,
+        'overdue_count': totals['overdue_count'],
+        'due_today_count': totals['due_today_count'],
+        'due_soon_count': totals['due_soon_count'],
+        'paid_count': totals['paid_count'],
+        'overdue_total': totals['overdue_total'],
+        'due_today_total': totals['due_today_total'],
+        'due_soon_total': totals['due_soon_total'],
+        'paid_total': totals['paid_total'],
+        'vendor_summary': vendor_summary,
+    }